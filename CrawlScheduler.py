@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+CrawlScheduler.py
+
+Splits the crawl into category shards built from 'quickfilters.csv' and
+decides which shards to refresh on each run, so fresh data comes in
+without crawling everything every time.
+
+SHARDS:
+- One shard per Section/Subsection in 'quickfilters.csv' (e.g.
+  "Computer Components/Graphics Cards").
+- A shard owns every product whose Part Number matches one of its
+  Format patterns (e.g. "HSAMB*"), and is crawled by searching the site
+  for each of those part-number prefixes (its queries).
+- A query's results replace the products its pattern owns only once the
+  query has finished cleanly; a blocked or failed query changes nothing.
+- A query loads at most MAX_PAGES_PER_QUERY pages. If it has more, the
+  deals it did see still replace those same products, but nothing else
+  it owns is dropped.
+
+SCHEDULING:
+- 'crawl_schedule.json' keeps, per shard, when it was last crawled, how
+  many pages that took, a hash of its content and an estimated change
+  rate (how often a crawl finds something different).
+- The change rate is a moving average, so volatile shards (e.g. GPUs
+  during sales) drift up and static ones drift down.
+- Each run picks shards by the chance they have changed since their last
+  crawl, 1 - (1 - rate) ** runs_since, until the page budget is spent.
+  Never-crawled shards, and shards older than MAX_AGE_PASSES full passes
+  (see COST), go first.
+- Big shards take several runs: a query cursor records how far the
+  current crawl of a shard got, the next run carries on from there (ahead
+  of everything else), and the shard's hash, rate and last run are only
+  updated once all its queries are done.
+- Every page load counts against the budget, including the one that
+  opens the browser. A run only starts a new query while budget is left,
+  so it overshoots by at most MAX_PAGES_PER_QUERY pages plus one browser
+  restart.
+
+COST:
+- The searches cover the whole catalogue, not just the deal listings,
+  and most of what they return is full price and thrown away. With the
+  current quickfilters.csv, 77 shards expand to 2,171 searches (1,602
+  distinct prefixes; several shards share some). That is about 2,700
+  page loads per full pass (LOADS_PER_QUERY each, plus connecting).
+  The two deal listings take about 10 pages for ~800 deals.
+- So a sharded pass costs far more than a normal full run. Use --sharded
+  for a catalogue-wide sweep for discounts, not in place of the daily
+  deal-listing crawl.
+- DEFAULT_PAGE_BUDGET = 300 page loads keeps a run well under an hour at
+  the scraper's pace (2-5 s per page, 10 s per browser restart). A pass
+  then takes about 10 runs, so shards are force-refreshed after 20.
+- The age limit is worked out from the actual cost of a pass at the
+  budget in use (measured page counts once shards have been crawled,
+  estimates before that). That way the change-rate ranking has room to
+  work before shards are forced to refresh; a fixed run count smaller
+  than one pass would send every shard to the front.
+"""
+
+import csv
+import fnmatch
+import hashlib
+import json
+import math
+import re
+from urllib.parse import quote_plus
+
+# --- CONFIGURATION ---
+
+QUICK_FILTER_CSV = "quickfilters.csv"
+SCHEDULE_FILE = "crawl_schedule.json"
+
+# Listing used to crawl a shard, one search per part-number prefix
+SEARCH_URL = "https://www.pbtech.co.nz/search?sf={query}"
+
+# Page loads the scraper may use per run when crawling shards (see COST)
+DEFAULT_PAGE_BUDGET = 300
+
+# Pages one search may load. A part-number prefix rarely has more than one page of
+# results (100 per page); a normal full run covers whatever is past this
+MAX_PAGES_PER_QUERY = 3
+
+# Page loads per search until a shard has been crawled once: one results page, plus
+# the browser restart the scraper does every 5 pages
+LOADS_PER_QUERY = 1.2
+
+# Weight of the latest crawl in a shard's change rate
+CHANGE_RATE_ALPHA = 0.3
+
+# Change rate assumed for a shard that hasn't been crawled yet
+INITIAL_CHANGE_RATE = 0.5
+
+# A shard is always refreshed once it is this many full passes old (in runs, at the page budget)
+MAX_AGE_PASSES = 2
+
+# --- END CONFIGURATION ---
+
+
+class Shard:
+    """A quickfilters.csv category and the part-number patterns it owns."""
+
+    def __init__(self, section, subsection, formats):
+        self.id = f"{section}/{subsection}"
+        self.formats = sorted(set(formats))
+        self.matcher = make_matcher(self.formats)
+        # Each search query and the patterns whose products it finds
+        by_query = {}
+        for f in self.formats:
+            if f.rstrip("*"): by_query.setdefault(f.rstrip("*"), []).append(f)
+        self.query_matchers = {q: make_matcher(fs) for q, fs in by_query.items()}
+
+    def owns(self, row, query=None):
+        """True if the row's Part Number is one of this shard's (or just `query`'s) products."""
+        part_num = row.get("Part Number")
+        matcher = self.matcher if query is None else self.query_matchers[query]
+        return bool(part_num) and matcher.match(str(part_num).strip().upper()) is not None
+
+    def queries(self):
+        return sorted(self.query_matchers)
+
+    def url(self, query):
+        return SEARCH_URL.format(query=quote_plus(query))
+
+
+def make_matcher(formats):
+    return re.compile("|".join(fnmatch.translate(f.upper()) for f in formats))
+
+
+def load_shards(path=QUICK_FILTER_CSV):
+    groups = {}
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            fmt = (row.get("Format") or "").strip()
+            if not fmt: continue
+            key = (row["Section"], row["Subsection"])
+            groups.setdefault(key, []).append(fmt)
+    return [Shard(section, subsection, formats) for (section, subsection), formats in groups.items()]
+
+def content_hash(rows):
+    """Order-independent hash of the fields that matter for the site."""
+    h = hashlib.sha256()
+    lines = sorted(json.dumps([r.get("Part Number"), r.get("Original Price"), r.get("Discount Price"), r.get("% Discount"), r.get("PromoCode")]) for r in rows)
+    for line in lines:
+        h.update(line.encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+class CrawlScheduler:
+    """Picks which shards to crawl this run and learns how often each one changes."""
+
+    def __init__(self, shards, path=SCHEDULE_FILE, page_budget=DEFAULT_PAGE_BUDGET):
+        self.shards = shards
+        self.path = path
+        self.page_budget = page_budget
+        try:
+            with open(path, "r", encoding="utf-8") as f: data = json.load(f)
+        except (OSError, ValueError): data = {}
+        self.run = data.get("run", 0) + 1
+        self.stats = data.get("shards", {})
+        # Runs one pass over every shard takes at this budget
+        self.pass_runs = max(1, math.ceil(self.full_pass_pages() / page_budget))
+        self.max_age_runs = MAX_AGE_PASSES * self.pass_runs
+
+    def stat(self, shard):
+        return self.stats.get(shard.id, {})
+
+    def cursor(self, shard):
+        """Number of the shard's queries already done in its current crawl."""
+        return self.stat(shard).get("cursor", 0)
+
+    def full_pages(self, shard):
+        """Page loads a whole crawl of the shard takes: as measured last time, else estimated."""
+        return self.stat(shard).get("pages") or math.ceil(len(shard.queries()) * LOADS_PER_QUERY) + 1
+
+    def full_pass_pages(self):
+        return sum(self.full_pages(s) for s in self.shards if s.queries())
+
+    def estimated_pages(self, shard):
+        """Page loads needed to finish the shard's current crawl."""
+        total = len(shard.queries())
+        remaining = total - self.cursor(shard)
+        return max(1, math.ceil(self.full_pages(shard) * remaining / total))
+
+    def priority(self, shard):
+        st = self.stat(shard)
+        # Finish a crawl that's under way before starting others
+        if "last_run" not in st or st.get("cursor"): return float("inf")
+        age = self.run - st["last_run"]
+        if age >= self.max_age_runs: return float("inf")
+        rate = st.get("rate", INITIAL_CHANGE_RATE)
+        return 1.0 - (1.0 - rate) ** age
+
+    def plan(self):
+        """Shards to crawl this run, most likely to have changed first, until their estimated
+        pages reach the page budget. The last one may only be partly crawled this run."""
+        # Oldest first among equal priorities, so overdue shards rotate fairly
+        ranked = sorted((s for s in self.shards if s.queries()), key=lambda s: (-self.priority(s), self.stat(s).get("last_run", 0)))
+        chosen, pages = [], 0
+        for shard in ranked:
+            if pages >= self.page_budget: break
+            chosen.append(shard)
+            pages += self.estimated_pages(shard)
+        return chosen
+
+    def advance(self, shard, queries_done, pages):
+        """Moves the shard's query cursor past `queries_done` more queries, which took `pages`
+        page loads (failed attempts included). Returns True once all its queries are done."""
+        st = self.stats.setdefault(shard.id, {})
+        st["cursor"] = st.get("cursor", 0) + queries_done
+        st["crawl_pages"] = st.get("crawl_pages", 0) + pages
+        return st["cursor"] >= len(shard.queries())
+
+    def record(self, shard, rows):
+        """Records a finished crawl; `rows` are the shard's products after it."""
+        st = self.stats.setdefault(shard.id, {})
+        pages = st.pop("crawl_pages", 0)
+        st.pop("cursor", None)
+        new_hash = content_hash(rows)
+        if "hash" in st:
+            changed = 1.0 if new_hash != st["hash"] else 0.0
+            rate = st.get("rate", INITIAL_CHANGE_RATE)
+            st["rate"] = round(CHANGE_RATE_ALPHA * changed + (1 - CHANGE_RATE_ALPHA) * rate, 4)
+        else:
+            st["rate"] = INITIAL_CHANGE_RATE
+        st["hash"] = new_hash
+        st["last_run"] = self.run
+        st["pages"] = pages
+        st["rows"] = len(rows)
+
+    def save(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump({"run": self.run, "shards": self.stats}, f, indent=2, sort_keys=True)
+            f.write("\n")
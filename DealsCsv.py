@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+DealsCsv.py
+
+The deals CSV format shared by the scraper, DupeDeleter.py, the pipeline
+and the site generator: its columns and how rows are written and read
+back. Stdlib only, so any script can import it cheaply.
+
+ROWS:
+- Row dicts use CSV_COLUMNS as keys. The published CSV has only those;
+  the raw scrape (RAW_COLUMNS) also keeps "Site", the listing a row came
+  from, which DupeDeleter.py's "site" ranking needs.
+- Read back, prices are floats or None and "% Discount" is a float,
+  "SPECIAL" or None, the same shape the scraper produces.
+"""
+
+import csv
+
+CSV_COLUMNS = ["Product name", "Part Number", "Original Price", "Discount Price", "% Discount", "PromoCode", "Link"]
+RAW_COLUMNS = CSV_COLUMNS + ["Site"]
+PRICE_COLUMNS = ["Original Price", "Discount Price"]
+
+
+def parse_price(val):
+    if val is None or val == "": return None
+    try: return float(str(val).replace("$", "").replace(",", ""))
+    except ValueError: return None
+
+def parse_pct(val):
+    if val is None or val == "": return None
+    if str(val).strip().upper() == "SPECIAL": return "SPECIAL"
+    try: return float(val)
+    except ValueError: return None
+
+def read_rows(path):
+    """Reads a deals CSV back into typed rows ("Site" included if the file has it)."""
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        columns = RAW_COLUMNS if "Site" in (reader.fieldnames or ()) else CSV_COLUMNS
+        for raw in reader:
+            row = {c: (raw.get(c) or None) for c in columns}
+            for c in PRICE_COLUMNS: row[c] = parse_price(row[c])
+            row["% Discount"] = parse_pct(row["% Discount"])
+            rows.append(row)
+    return rows
+
+def make_writer(f, columns=CSV_COLUMNS):
+    """A CSV writer for the deals columns on an open file, header already written."""
+    # "\n" line endings, as the files have always had
+    writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    return writer
+
+def write_row(writer, row):
+    writer.writerow({c: ("" if row.get(c) is None else row.get(c)) for c in writer.fieldnames})
+
+def write_rows(rows, path, columns=CSV_COLUMNS):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = make_writer(f, columns)
+        for row in rows: write_row(writer, row)
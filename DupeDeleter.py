@@ -2,28 +2,40 @@
 """
 DupeDeleter.py
 
-Reads the 'pbtech_deals_playwright.csv' file generated by the scraper,
+Reads the 'pbtech_deals.csv' file generated by the scraper,
 processes duplicates with specific logic, and saves the cleaned
-data to 'filtered_catalog.csv'.
+data back to the same file (sorted by Part Number, the same way
+GithubVersionPipeline.py saves it), so the site generator picks it up.
+
+The same logic is exposed as the streaming `DedupeStage` (and the
+`dedupe_rows()` wrapper) so GithubVersionPipeline.py can dedupe the
+scraper's rows in memory as each page comes in.
 
 DEDUPLICATION LOGIC:
 - Identifies duplicates by "Part Number" (or "Link" + "Name" as a fallback).
-- If a "good" item (PromoCode is NOT on the undesirable list) and
-  a "bad" item (PromoCode IS on the list) are found for the same product,
-  this script will *always keep* the "good" item.
-- If both items are "good" or both are "bad", it keeps the first one it finds.
+- Only the single best row per product is kept, so memory grows with the
+  number of unique products, not the number of rows seen.
+- "Best" is decided by the RANKING criteria, in order:
+    price - lowest "Discount Price" wins
+    promo - a promo NOT on the undesirable list beats one that is
+    site  - the site listed first in SITE_PREFERENCE wins
+    (e.g. the same product in both HOT DEALS and CLEARANCE ZONE). This
+    needs the "Site" column: live rows and the pipeline's raw CSV have it,
+    the deduped 'pbtech_deals.csv' doesn't, so re-deduping that file
+    ranks every row as an unknown site.
+- If every criterion ties, it keeps the first one it finds.
 """
 
-import csv
 import os
+import re
+from functools import lru_cache
 
-# --- CONFIGURATION ---
+from DealsCsv import read_rows, write_rows
 
-# The file to read from (generated by your scraper)
-INPUT_FILE = "pbtech_deals_playwright.csv"
+# --- CONFIGURATION ---
 
-# The new, clean file to create
-OUTPUT_FILE = "filtered_catalog.csv"
+# The file to dedupe in place (generated by your scraper)
+INPUT_FILE = "pbtech_deals.csv"
 
 # List of "undesirable" promo codes.
 # These will be replaced by duplicates that DON'T have them.
@@ -34,20 +46,30 @@ UNDESIRABLE_PROMOS = [
     "REMANUFACTURED"
 ]
 
+# Criteria used to pick the best duplicate, most important first.
+# Any subset/order of: "price", "promo", "site"
+RANKING = ["price", "promo", "site"]
+
+# Preferred source sites (the scraper's SITE_CONFIGS names), best first.
+# Rows from unknown sites rank after all of these.
+SITE_PREFERENCE = ["HOT DEALS", "CLEARANCE ZONE"]
+
 # --- END CONFIGURATION ---
 
 
+# One regex for the whole list, so each promo string is scanned once
+UNDESIRABLE_RE = re.compile("|".join(re.escape(code) for code in UNDESIRABLE_PROMOS))
+
+@lru_cache(maxsize=None)
+def promo_rank(promo_upper):
+    """0 for a normal promo (or none), 1 for an undesirable one. Cached per distinct promo."""
+    return 1 if UNDESIRABLE_RE.search(promo_upper) else 0
+
 def is_undesirable(promo_code):
     """Helper function to check if a promo code is on the bad list."""
     if not promo_code:
         return False
-    
-    # Check if any of the "undesirable" strings are *in* the promo code
-    promo_upper = str(promo_code).upper()
-    for code in UNDESIRABLE_PROMOS:
-        if code in promo_upper:
-            return True
-    return False
+    return promo_rank(str(promo_code).upper()) == 1
 
 def get_product_key(row):
     """Gets the unique identifier (Part Num or fallback) for a row."""
@@ -63,87 +85,112 @@ def get_product_key(row):
     return f"{link}|{name}"
 
 
+def row_sort_key(row):
+    """Canonical output order (by product), so unchanged data always saves identically."""
+    return (str(row.get("Part Number") or ""), str(row.get("Product name") or ""), str(row.get("Link") or ""))
+
+
+def parse_price(val):
+    """Discount Price as a float (rows may come from the scraper or a CSV). Missing sorts last."""
+    if val is None or val == "":
+        return float("inf")
+    try:
+        return float(str(val).replace("$", "").replace(",", ""))
+    except ValueError:
+        return float("inf")
+
+
+class DedupeStage:
+    """
+    Streaming deduplicator. Feed it rows with add()/extend() as they are
+    produced and read the survivors back with rows(). Only the current
+    best row (and its rank) is stored per product key.
+    """
+
+    def __init__(self, ranking=None, site_preference=None):
+        self.ranking = list(RANKING if ranking is None else ranking)
+        unknown = ",".join(c for c in self.ranking if c not in ("price", "promo", "site"))
+        if unknown:
+            raise ValueError(f"Unknown ranking criteria: {unknown}")
+        sites = SITE_PREFERENCE if site_preference is None else site_preference
+        self.site_rank = {name: i for i, name in enumerate(sites)}
+        self.best_items = {}
+        self.seen = 0
+
+    def rank(self, row):
+        """Sort key for a row; lower is better."""
+        key = []
+        for criterion in self.ranking:
+            if criterion == "price":
+                key.append(parse_price(row.get("Discount Price")))
+            elif criterion == "promo":
+                promo = row.get("PromoCode")
+                key.append(promo_rank(str(promo).upper()) if promo else 0)
+            elif criterion == "site":
+                key.append(self.site_rank.get(row.get("Site"), len(self.site_rank)))
+        return tuple(key)
+
+    def add(self, row):
+        self.seen += 1
+        key = get_product_key(row)
+        rank = self.rank(row)
+        existing = self.best_items.get(key)
+        # Strictly better only, so full ties keep the first one found
+        if existing is None or rank < existing[0]:
+            self.best_items[key] = (rank, row)
+
+    def extend(self, rows):
+        for row in rows:
+            self.add(row)
+        return self
+
+    def rows(self):
+        return [row for _, row in self.best_items.values()]
+
+    @property
+    def removed(self):
+        return self.seen - len(self.best_items)
+
+
+def dedupe_rows(rows):
+    """Returns one row per product key: the best one according to RANKING."""
+    return DedupeStage().extend(rows).rows()
+
+
 def main():
     """Main processing function."""
     
     # 1. Check if the input file exists
     if not os.path.exists(INPUT_FILE):
         print(f"Error: Input file '{INPUT_FILE}' not found.")
-        print("Please run your 'MoreSiteScraper.py' script first to generate it.")
+        print("Please run 'GithubVersionScraper.py' first to generate it.")
         return
 
     print(f"Reading items from '{INPUT_FILE}'...")
-    all_rows = []
-    fieldnames = []
     
-    # 2. Read all data from the input CSV
+    # 2. Stream the input rows through the deduplicator
     try:
-        with open(INPUT_FILE, mode='r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            fieldnames = reader.fieldnames
-            if not fieldnames:
-                print("Error: CSV file appears to be empty or has no headers.")
-                return
-            
-            all_rows = list(reader)
-            
+        stage = DedupeStage().extend(read_rows(INPUT_FILE))
     except Exception as e:
         print(f"Error reading {INPUT_FILE}: {e}")
         return
 
-    if not all_rows:
+    if not stage.seen:
         print("Input file is empty. No processing needed.")
         return
 
-    print(f"Processing {len(all_rows)} total items for duplicates...")
+    # 3. Collect the best item for each product, in the canonical order
+    final_list = sorted(stage.rows(), key=row_sort_key)
 
-    # 3. Process duplicates
-    # This dictionary will hold the *best* item found so far for each key
-    best_items = {} 
+    print(f"Processed {stage.seen} total items. Removed {stage.removed} duplicates.")
 
-    for row in all_rows:
-        key = get_product_key(row)
-        
-        if key not in best_items:
-            # This is the first time we've seen this product.
-            # Add it as the "best" one for now.
-            best_items[key] = row
-        else:
-            # Duplicate found. Compare it with the one we already stored.
-            existing_item = best_items[key]
-            
-            existing_is_bad = is_undesirable(existing_item.get("PromoCode"))
-            new_is_bad = is_undesirable(row.get("PromoCode"))
-
-            # PREFERENCE LOGIC:
-            # If the item we *already have* is "bad" (e.g., "FREE SHIPPING")
-            # and this *new item* is "good" (e.g., "BFDEALS"),
-            # then replace the bad one with this good one.
-            if existing_is_bad and not new_is_bad:
-                best_items[key] = row
-            
-            # In all other cases, we do nothing:
-            # - If existing is "good" and new is "bad": Keep "good" existing.
-            # - If both are "good": Keep the first one (existing).
-            # - If both are "bad": Keep the first one (existing).
-            
-    # The final list is just the values from our dictionary
-    final_list = list(best_items.values())
-
-    print(f"Removed {len(all_rows) - len(final_list)} undesirable duplicates.")
-
-    # 4. Write the clean data to the output file
+    # 4. Write the clean data back for the site generator
     try:
-        with open(OUTPUT_FILE, mode='w', encoding='utf-8', newline='') as f:
-            # Use the same column headers from the original file
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(final_list)
-            
-        print(f"\nSuccessfully saved {len(final_list)} unique products to '{OUTPUT_FILE}'")
+        write_rows(final_list, INPUT_FILE)
+        print(f"\nSuccessfully saved {len(final_list)} unique products to '{INPUT_FILE}'")
         
     except Exception as e:
-        print(f"Error writing to {OUTPUT_FILE}: {e}")
+        print(f"Error writing to {INPUT_FILE}: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+GithubVersionPipeline.py
+
+Runs the whole daily job in a single interpreter:
+
+    scrape -> dedupe -> site-gen
+
+Each stage is a plain function that takes and returns a list of typed
+row dicts (the scraper's columns, with prices as floats or None and
+"% Discount" as a float, "SPECIAL" or None), so rows are passed along in
+memory instead of being written to CSV and re-parsed by the next script.
+During a live scrape the dedupe stage consumes each page as it arrives,
+so only the best row per product is ever held.
+
+MATERIALISATION:
+- The deduped dataset is always saved to 'pbtech_deals.csv' (the file
+  the site publishes and the standalone generator reads).
+- With --materialise the raw scrape is also saved to 'pbtech_deals_raw.csv'
+  (for --sharded runs: this run's rows plus the ones carried over), with
+  a "Site" column so re-deduping it ranks by site as a live scrape does.
+
+STAGE SKIPPING:
+- The dedupe stage records a fingerprint of its input and a hash of the
+  deduped CSV it wrote in 'pipeline_state.json'; the saved output is
+  reused only if both still match (so a CSV rewritten since, e.g. by a
+  later scrape, is never mistaken for the dedupe of this input).
+- The generator keeps its own content hash in 'last_updated.json' and
+  leaves index.html alone when the rows and its other inputs hash the
+  same (see GithubVersionSiteGen.py).
+- --skip-scrape reuses the last raw (or deduped) CSV instead of scraping.
+  The raw CSV is only used while 'pbtech_deals.csv' is still the one built
+  from it; once anything else has rewritten the deals CSV, that wins.
+
+DETERMINISTIC OUTPUT:
+- Rows are saved and rendered in a stable order (by Part Number), and
+  index.html has no timestamp in it ('last_updated.json' holds that), so
+  a run with unchanged data rewrites every file byte-for-byte and git
+  sees nothing to commit.
+
+ENRICHMENT:
+- With --enrich, product pages for new or changed products are fetched
+  into 'product_cache.json' (see ProductEnricher.py) before generating.
+  The generator always includes whatever is already cached.
+
+SHARDED CRAWLS:
+- With --sharded only the category shards CrawlScheduler.py picks for
+  this run are crawled (within --page-budget page loads); every other
+  product, and every product of a query that was blocked or failed, is
+  carried over from the last 'pbtech_deals.csv'.
+- Products outside every quickfilters.csv category are only refreshed by
+  a normal full run, so keep one of those on a slower schedule.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import nullcontext
+
+from CrawlScheduler import DEFAULT_PAGE_BUDGET, MAX_PAGES_PER_QUERY, CrawlScheduler, load_shards
+from DealsCsv import RAW_COLUMNS, make_writer, read_rows, write_row, write_rows
+from DupeDeleter import DedupeStage, get_product_key, row_sort_key
+
+# --- CONFIGURATION ---
+
+RAW_CSV = "pbtech_deals_raw.csv"
+DEALS_CSV = "pbtech_deals.csv"
+OUT_HTML = "index.html"
+STATE_FILE = "pipeline_state.json"
+
+# Files whose contents affect the dedupe result (ranking config lives in the script)
+DEDUPE_INPUTS = ["DupeDeleter.py"]
+
+# --- END CONFIGURATION ---
+
+
+# ---- Stage State ----
+def fingerprint(rows, extra_files=()):
+    h = hashlib.sha256()
+    for row in rows:
+        h.update(json.dumps([row.get(c) for c in RAW_COLUMNS]).encode("utf-8"))
+        h.update(b"\n")
+    for path in extra_files:
+        h.update(path.encode("utf-8"))
+        try:
+            with open(path, "rb") as f: h.update(f.read())
+        except OSError: h.update(b"<missing>")
+    return h.hexdigest()
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def save_state(state):
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f: return hashlib.sha256(f.read()).hexdigest()
+    except OSError: return None
+
+def is_fresh(state, stage, key, output_path):
+    """True if the stage last ran on this input and its output file is still exactly what it wrote."""
+    entry = state.get(stage)
+    return isinstance(entry, dict) and entry.get("input") == key and entry.get("output") == file_hash(output_path)
+
+
+# ---- Stages ----
+def stage_scrape(materialise=False):
+    """Scrapes every site, deduping rows page by page as they stream in.
+    Only the best row per product is held in memory."""
+    # Imported here so skipped runs don't pay for Playwright/BeautifulSoup startup
+    from GithubVersionScraper import scrape_all
+
+    dedupe = DedupeStage()
+    with (open(RAW_CSV, "w", encoding="utf-8", newline="") if materialise else nullcontext()) as raw_file:
+        raw_writer = make_writer(raw_file, RAW_COLUMNS) if raw_file else None
+
+        def sink(page_rows):
+            dedupe.extend(page_rows)
+            if raw_writer:
+                for row in page_rows: write_row(raw_writer, row)
+
+        asyncio.run(scrape_all(sink=sink))
+
+    rows = sorted(dedupe.rows(), key=row_sort_key)
+    print(f"[scrape] {dedupe.seen} rows scraped -> {len(rows)} unique ({dedupe.removed} duplicates removed).", flush=True)
+    if rows: write_rows(rows, DEALS_CSV)
+    return rows
+
+def stage_scrape_sharded(page_budget=DEFAULT_PAGE_BUDGET, materialise=False):
+    """Crawls the shards the scheduler picks and merges them into the last dataset.
+    Only queries that finished cleanly replace the products they own, and any product
+    seen this run replaces its old row; everything else is carried over as it was."""
+    from GithubVersionScraper import scrape_shard
+
+    scheduler = CrawlScheduler(load_shards(), page_budget=page_budget)
+    plan = scheduler.plan()
+    print(f"[scrape] Run {scheduler.run}: crawling {len(plan)} of {len(scheduler.shards)} shards (budget {page_budget} pages, "
+          f"a full pass is ~{scheduler.full_pass_pages()} pages / {scheduler.pass_runs} runs).", flush=True)
+
+    async def crawl():
+        results, pages_used = [], 0
+        for shard in plan:
+            if pages_used >= page_budget: break
+            done, pages = await scrape_shard(shard, page_budget - pages_used, start=scheduler.cursor(shard), max_pages=MAX_PAGES_PER_QUERY)
+            pages_used += pages
+            results.append((shard, done, pages))
+        print(f"[scrape] {pages_used} page loads used.", flush=True)
+        return results
+
+    fresh, replaced, finished = [], [], []
+    for shard, done, pages in asyncio.run(crawl()):
+        remaining = len(shard.queries()) - scheduler.cursor(shard)
+        rows = [r for _, query_rows, _ in done for r in query_rows]
+        print(f"[scrape] {shard.id}: {len(done)} of {remaining} remaining queries done, {len(rows)} deals, {pages} page loads.", flush=True)
+        fresh.extend(rows)
+        replaced.extend((shard, query) for query, _, complete in done if complete)
+        if scheduler.advance(shard, len(done), pages): finished.append(shard)
+
+    previous = read_rows(DEALS_CSV) if os.path.exists(DEALS_CSV) else []
+    seen = {get_product_key(r) for r in fresh}
+    carried = [r for r in previous if get_product_key(r) not in seen and not any(shard.owns(r, query) for shard, query in replaced)]
+    # --skip-scrape treats the raw file as a whole scrape, so it gets the merged set, not just this run's shards
+    if materialise: write_rows(carried + fresh, RAW_CSV, RAW_COLUMNS)
+    dedupe = DedupeStage().extend(carried).extend(fresh)
+    rows = sorted(dedupe.rows(), key=row_sort_key)
+    print(f"[scrape] {len(fresh)} fresh + {len(carried)} carried over -> {len(rows)} unique.", flush=True)
+    # A shard's change rate is judged on its whole product set, once all its queries are in
+    for shard in finished: scheduler.record(shard, [r for r in rows if shard.owns(r)])
+    scheduler.save()
+    if rows: write_rows(rows, DEALS_CSV)
+    return rows
+
+def load_scraped(state):
+    """Rows to re-run from: the raw CSV if the deals CSV is still the one built from it, else the deals CSV."""
+    if os.path.exists(RAW_CSV):
+        if state.get("raw_for") == file_hash(DEALS_CSV):
+            print(f"[scrape] Skipped. Reusing rows from '{RAW_CSV}'.", flush=True)
+            return read_rows(RAW_CSV), RAW_CSV
+        print(f"[scrape] '{RAW_CSV}' isn't what '{DEALS_CSV}' was last built from. Ignoring it.", flush=True)
+    if os.path.exists(DEALS_CSV):
+        print(f"[scrape] Skipped. Reusing rows from '{DEALS_CSV}'.", flush=True)
+        return read_rows(DEALS_CSV), DEALS_CSV
+    print("[scrape] Skipped, but there is nothing on disk to reuse.", flush=True)
+    return [], None
+
+def stage_dedupe(rows, state, force=False):
+    key = fingerprint(rows, DEDUPE_INPUTS)
+    if not force and is_fresh(state, "dedupe", key, DEALS_CSV):
+        print(f"[dedupe] Input unchanged. Reusing '{DEALS_CSV}'.", flush=True)
+        return read_rows(DEALS_CSV)
+
+    dedupe = DedupeStage().extend(rows)
+    deduped = sorted(dedupe.rows(), key=row_sort_key)
+    print(f"[dedupe] {dedupe.seen} -> {len(deduped)} rows ({dedupe.removed} duplicates removed).", flush=True)
+    write_rows(deduped, DEALS_CSV)
+    state["dedupe"] = {"input": key, "output": file_hash(DEALS_CSV)}
+    return deduped
+
+def stage_enrich(rows):
+    """Refreshes cached product-page details (see ProductEnricher.py); the generator reads the cache."""
+    from ProductEnricher import enrich_rows
+    enrich_rows(rows)
+
+def stage_generate(rows, force=False):
+    # The generator hashes the rows and its other inputs itself and skips unchanged rebuilds
+    from GithubVersionSiteGen import generate_site
+    generate_site(rows=rows, out_html=OUT_HTML, force=force)
+
+
+def run_pipeline(skip_scrape=False, materialise=False, force=False, sharded=False, page_budget=DEFAULT_PAGE_BUDGET, enrich=False):
+    state = load_state()
+    if skip_scrape:
+        rows, source = load_scraped(state)
+        if rows: rows = stage_dedupe(rows, state, force=force)
+        # The deals CSV was just rebuilt from the raw one, so they still belong together
+        if rows and source == RAW_CSV: state["raw_for"] = file_hash(DEALS_CSV)
+    else:
+        # A live scrape replaces the deals CSV; the raw CSV only counts again if this run writes it
+        state.pop("raw_for", None)
+        if sharded: rows = stage_scrape_sharded(page_budget=page_budget, materialise=materialise)
+        else: rows = stage_scrape(materialise=materialise)
+        if rows and materialise: state["raw_for"] = file_hash(DEALS_CSV)
+    if not rows:
+        print("No rows to process. Leaving existing outputs untouched.", flush=True)
+        save_state(state)
+        return
+    if enrich: stage_enrich(rows)
+    stage_generate(rows, force=force)
+    save_state(state)
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape, dedupe and generate the deals site in one process.")
+    parser.add_argument("--skip-scrape", action="store_true", help=f"reuse '{RAW_CSV}' (or '{DEALS_CSV}') instead of scraping")
+    parser.add_argument("--materialise", action="store_true", help=f"also save the raw scrape to '{RAW_CSV}'")
+    parser.add_argument("--force", action="store_true", help="re-run every stage even if its input is unchanged")
+    parser.add_argument("--sharded", action="store_true", help="only crawl the category shards scheduled for this run")
+    parser.add_argument("--page-budget", type=int, default=DEFAULT_PAGE_BUDGET, help=f"pages to load per sharded run (default {DEFAULT_PAGE_BUDGET})")
+    parser.add_argument("--enrich", action="store_true", help="fetch product pages for new/changed products into the details cache")
+    args = parser.parse_args()
+    run_pipeline(skip_scrape=args.skip_scrape, materialise=args.materialise, force=args.force, sharded=args.sharded, page_budget=args.page_budget, enrich=args.enrich)
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,16 @@ import re
 import os
 import random
 from urllib.parse import urljoin
-import pandas as pd
 from bs4 import BeautifulSoup
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
+from DealsCsv import write_rows
+from DupeDeleter import row_sort_key
 
 BASE = "https://www.pbtech.co.nz"
 PER_PAGE = 100
 MAX_PAGES = 300
 PAGES_BEFORE_RESET = 5  # <--- NEW: Restart browser every 5 pages to clear "suspicion"
+OUTPUT_FILE = "pbtech_deals.csv"
 
 # --- CONFIGURATION ---
 SITE_CONFIGS = {
@@ -38,7 +40,8 @@ def safe_text(el):
     return el.get_text(" ", strip=True) if el else ""
 
 def make_page_url(base_url, page_num):
-    return f"{base_url}?pg={page_num}"
+    sep = "&" if "?" in base_url else "?"
+    return f"{base_url}{sep}pg={page_num}"
 
 def parse_price_from_ginc(price_el):
     if not price_el: return None
@@ -240,93 +243,162 @@ async def scrape_page(page, page_num, base_url):
     print(f"[Page {page_num}] FAILED after {max_retries} attempts. Skipping.", flush=True)
     return [] 
 
-async def run_scraper_for_site(config):
-    site_name = config['name']
-    base_url = config['base_url']
-    print(f"STARTING SCRAPE FOR: {site_name}", flush=True)
-    all_results = []
-    
-    async with async_playwright() as p:
-        # Start initial browser
-        browser, context = await launch_stealth_browser(p)
-        page = await context.new_page()
+class ListingSession:
+    """One stealth browser with the listing view (PER_PAGE rows, expanded list) set up.
+    Restarts itself every PAGES_BEFORE_RESET pages. `loads` counts every page it loads,
+    including the connection load that sets the view up."""
 
-        # Connect
-        try:
-            print("Connecting...", flush=True)
-            await page.goto(make_page_url(base_url, 1), timeout=60000, wait_until="domcontentloaded")
-        except Exception as e:
-            print(f"Initial connection failed: {e}", flush=True)
-            await browser.close()
-            return []
+    def __init__(self, p):
+        self.p = p
+        self.browser = None
+        self.page = None
+        self.pages = 0
+        self.loads = 0
+
+    async def start(self, url):
+        """Launches the browser, loads `url` and applies the view settings. Raises if `url` doesn't load."""
+        self.browser, context = await launch_stealth_browser(self.p)
+        self.page = await context.new_page()
+        self.loads += 1
+        await self.page.goto(url, timeout=60000, wait_until="domcontentloaded")
 
         # View Settings
         try:
-            await page.select_option("select.rec_num.js-rec-num", str(PER_PAGE), timeout=5000)
+            await self.page.select_option("select.rec_num.js-rec-num", str(PER_PAGE), timeout=5000)
             await asyncio.sleep(2)
         except: pass
 
         try:
-            view_button = page.locator('div.js-change-view[title="View as expanded list"]')
+            view_button = self.page.locator('div.js-change-view[title="View as expanded list"]')
             if "active" not in (await view_button.get_attribute("class") or ""):
                 await view_button.click(timeout=5000)
         except: pass
 
-        # PAGE LOOP WITH SESSION RESET
-        for page_num in range(1, MAX_PAGES + 1):
-            
-            # --- SESSION RESET LOGIC ---
-            if page_num > 1 and (page_num - 1) % PAGES_BEFORE_RESET == 0:
-                print(f"\n[System] Reached {PAGES_BEFORE_RESET} pages. RESTARTING BROWSER to clear footprints...\n", flush=True)
-                await browser.close()
-                await asyncio.sleep(10) # Wait 10s to look like a new user
-                browser, context = await launch_stealth_browser(p)
-                page = await context.new_page()
-                
-                # We need to re-apply view settings on the new session
-                try:
-                    await page.goto(make_page_url(base_url, page_num), timeout=60000, wait_until="domcontentloaded")
-                    await page.select_option("select.rec_num.js-rec-num", str(PER_PAGE), timeout=5000)
-                    await asyncio.sleep(1)
-                    view_button = page.locator('div.js-change-view[title="View as expanded list"]')
-                    if "active" not in (await view_button.get_attribute("class") or ""):
-                        await view_button.click(timeout=5000)
-                except: pass
-
-            page_results = await scrape_page(page, page_num, base_url)
-            
-            if page_results is None: 
-                print(f"Finished scraping {site_name}.", flush=True)
-                break
-            
-            if page_results:
-                all_results.extend(page_results)
-        
-        await browser.close()
+    async def scrape(self, page_num, base_url):
+        # --- SESSION RESET LOGIC ---
+        if self.pages and self.pages % PAGES_BEFORE_RESET == 0:
+            print(f"\n[System] Reached {PAGES_BEFORE_RESET} pages. RESTARTING BROWSER to clear footprints...\n", flush=True)
+            await self.close()
+            await asyncio.sleep(10) # Wait 10s to look like a new user
+            # We need to re-apply view settings on the new session
+            try: await self.start(make_page_url(base_url, page_num))
+            except: pass
+        self.pages += 1
+        self.loads += 1
+        return await scrape_page(self.page, page_num, base_url)
+
+    async def close(self):
+        if self.browser: await self.browser.close()
+        self.browser = None
+
+async def crawl_listing(session, config, sink=None, stop_on_failure=False):
+    """Loads a listing page by page until the "no products" banner (or config's "max_pages").
+    If `sink` is given each page's rows are passed to it as they arrive (and not kept here).
+    Returns (rows, status): "finished" if the banner was reached, "max_pages" if the page
+    limit came first, or "failed" if `stop_on_failure` is set and a page failed to load."""
+    site_name = config['name']
+    base_url = config['base_url']
+    all_results = []
+    for page_num in range(1, config.get('max_pages', MAX_PAGES) + 1):
+        page_results = await session.scrape(page_num, base_url)
+
+        if page_results is None:
+            print(f"Finished scraping {site_name}.", flush=True)
+            return all_results, "finished"
+
+        if not page_results:
+            if stop_on_failure:
+                print(f"[{site_name}] Page {page_num} failed. Stopping this listing.", flush=True)
+                return all_results, "failed"
+            continue
+
+        for row in page_results: row["Site"] = site_name
+        if sink: sink(page_results)
+        else: all_results.extend(page_results)
+    return all_results, "max_pages"
+
+async def run_scraper_for_site(config, sink=None):
+    """Scrapes one listing. If `sink` is given each page's rows are passed to it
+    as they arrive (and not kept here); otherwise all rows are returned.
+    `config` may set "max_pages"."""
+    print(f"STARTING SCRAPE FOR: {config['name']}", flush=True)
+
+    async with async_playwright() as p:
+        session = ListingSession(p)
+        try:
+            # Connect
+            try:
+                print("Connecting...", flush=True)
+                await session.start(make_page_url(config['base_url'], 1))
+            except Exception as e:
+                print(f"Initial connection failed: {e}", flush=True)
+                return []
+            all_results, _ = await crawl_listing(session, config, sink=sink)
+        finally:
+            await session.close()
     return all_results
 
-async def main():
-    valid_keys = ["1", "2"] 
-    print(f"Automated mode. Scraping sites: {valid_keys}", flush=True)
-    
+async def scrape_all(site_keys=None, sink=None):
+    """Scrapes every configured site (or just `site_keys`) and returns the rows in memory.
+    With a `sink`, rows are streamed to it page by page instead and nothing is returned."""
+    if site_keys is None: site_keys = list(SITE_CONFIGS.keys())
+    print(f"Automated mode. Scraping sites: {site_keys}", flush=True)
+
     master_results_list = []
-    for key in valid_keys:
+    for key in site_keys:
         config = SITE_CONFIGS[key]
-        site_results = await run_scraper_for_site(config)
+        site_results = await run_scraper_for_site(config, sink=sink)
         if site_results: master_results_list.extend(site_results)
+    return master_results_list
+
+async def scrape_shard(shard, page_budget, start=0, max_pages=MAX_PAGES):
+    """Crawls a CrawlScheduler shard's search queries, from query number `start`, in one browser.
+    A new query is only started while fewer than `page_budget` pages have been loaded, and each
+    query loads at most `max_pages` pages, so the budget is overshot by at most that (plus a
+    browser restart). Stops at the first query where a page fails to load.
+    Returns (done, loads): `done` is [(query, deal rows it owns, complete)] for each query that
+    got through, in order, where `complete` is False if it hit `max_pages` before the last page;
+    `loads` counts every page load, connecting included."""
+    done = []
+    async with async_playwright() as p:
+        session = ListingSession(p)
+        try:
+            for query in shard.queries()[start:]:
+                if session.loads >= page_budget:
+                    print(f"[{shard.id}] Page budget used up. Resuming next run.", flush=True)
+                    break
+                url = shard.url(query)
+                if session.browser is None:
+                    try:
+                        print(f"[{shard.id}] Connecting...", flush=True)
+                        await session.start(make_page_url(url, 1))
+                    except Exception as e:
+                        print(f"[{shard.id}] Initial connection failed: {e}", flush=True)
+                        break
+                config = {"name": f"{shard.id} [{query}]", "base_url": url, "max_pages": max_pages}
+                rows, status = await crawl_listing(session, config, stop_on_failure=True)
+                if status == "failed": break
+                # Search results include other prefixes and full-price items
+                done.append((query, [r for r in rows if shard.owns(r, query) and is_deal_row(r)], status == "finished"))
+        finally:
+            await session.close()
+    return done, session.loads
+
+def is_deal_row(row):
+    # Search results include full-price items; only keep ones the deal listings would show
+    return bool(row.get("PromoCode") or row.get("Original Price") or row.get("% Discount") is not None)
+
+async def main():
+    master_results_list = await scrape_all()
 
-    cols = ["Product name", "Part Number", "Original Price", "Discount Price", "% Discount", "PromoCode", "Link"]
-    output_filename = "pbtech_deals.csv"
-    
     if master_results_list:
-        df = pd.DataFrame(master_results_list)
-        df = df.reindex(columns=cols)
-        df.to_csv(output_filename, index=False, encoding="utf-8")
-        print(f"\nSaved {len(df)} items to {output_filename}", flush=True)
+        # Page timing decides scrape order; save in a stable order instead
+        master_results_list.sort(key=row_sort_key)
+        write_rows(master_results_list, OUTPUT_FILE)
+        print(f"\nSaved {len(master_results_list)} items to {OUTPUT_FILE}", flush=True)
     else:
         print("\nNo products scraped. Creating empty CSV file.", flush=True)
-        df = pd.DataFrame(columns=cols)
-        df.to_csv(output_filename, index=False, encoding="utf-8")
+        write_rows([], OUTPUT_FILE)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,49 +1,89 @@
-import pandas as pd
+#!/usr/bin/env python3
+"""
+GithubVersionSiteGen.py
+
+Builds index.html from the deduped deals ('pbtech_deals.csv', or rows
+passed in by GithubVersionPipeline.py via generate_site()).
+
+ENGINES:
+- "stdlib" (default): reads the CSV with the csv module and processes plain
+  row dicts. Nothing heavy is imported, so a run takes a fraction of a second.
+- "pandas": the original DataFrame-based processing, only imported when
+  asked for (--engine pandas). Both feed the same payload/HTML code.
+"""
+
+import argparse
+import csv
 import html
 import re
 import json
-import sys
-from datetime import datetime
-import pytz 
+import hashlib
+import os
+import time
+from urllib.parse import quote
+from datetime import datetime, timezone
+from DealsCsv import CSV_COLUMNS, read_rows
+from ProductEnricher import CACHE_FILE, cached_fields, load_cache
 
 IN_CSV = "pbtech_deals.csv"
 OUT_HTML = "index.html"
 QUICK_FILTER_CSV = "quickfilters.csv"
+# Tiny file with the last-updated time and content hash, so index.html itself is deterministic
+TIMESTAMP_FILE = "last_updated.json"
+NUMERIC_COLUMNS = {"Original Price", "Discount Price", "% Discount"}
+# Everything besides the rows that ends up in the page
+SITE_INPUT_FILES = [__file__, QUICK_FILTER_CSV, "whatsnew.txt", CACHE_FILE]
 GST_RATE = 1.15
+ENGINES = ("stdlib", "pandas")
 
 # ---- Utility Functions ----
+def is_missing(x):
+    """None, NaN or pandas' NA, without needing pandas."""
+    if x is None: return True
+    try: return bool(x != x)
+    except TypeError: return True
+
+# Bound once instead of re-parsing a format string per cell
+PRICE_FMT = "${:,.2f}".format
+PCT_INT_FMT = "{:d}%".format
+PCT_FMT = "{:.2f}%".format
+
 def esc(x):
-    if pd.isna(x): return ""
+    if is_missing(x): return ""
     return html.escape(str(x)).replace("\n", " ").replace("\r", " ").replace(",", "&#44;")
 
 def to_numeric_price(val):
     try:
-        if pd.isna(val) or val == "": return None
+        if is_missing(val) or val == "": return None
+        if isinstance(val, float): return val
         s = str(val).strip().replace("$", "").replace(",", "")
         return float(s)
     except Exception: return None
 
 def fmt_price(val):
     try:
-        if pd.isna(val) or val == "": return ""
-        v = float(str(val).replace("$", "").replace(",", ""))
-        return f"${v:,.2f}"
+        if is_missing(val) or val == "": return ""
+        v = val if isinstance(val, float) else float(str(val).replace("$", "").replace(",", ""))
+        return PRICE_FMT(v)
     except Exception: return esc(str(val).strip())
 
 def fmt_pct(val):
     try:
-        if pd.isna(val) or val == "": return ""
+        if is_missing(val) or val == "": return ""
         v = float(val)
-        return f"{int(v)}%" if abs(v - int(v)) < 0.001 else f"{v:.2f}%"
+        return PCT_INT_FMT(int(v)) if abs(v - int(v)) < 0.001 else PCT_FMT(v)
     except Exception: return esc(str(val).strip())
 
+def read_records(path):
+    """Reads a CSV into row dicts, with empty cells as None."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return [{k: (v if v != "" else None) for k, v in row.items()} for row in csv.DictReader(f)]
+
 def generate_quick_filters_html():
     try:
-        df_filters = pd.read_csv(QUICK_FILTER_CSV)
-        df_filters.fillna("None", inplace=True)
         filters_tree = {}
-        for _, row in df_filters.iterrows():
-            s = row["Section"]; ss = row["Subsection"]; sss = row["SubSubSection"]; fmt = row["Format"]
+        for row in read_records(QUICK_FILTER_CSV):
+            s, ss, sss, fmt = (row.get(c) or "None" for c in ("Section", "Subsection", "SubSubSection", "Format"))
             if s not in filters_tree: filters_tree[s] = {}
             if ss not in filters_tree[s]: filters_tree[s][ss] = {}
             if sss not in filters_tree[s][ss]: filters_tree[s][ss][sss] = []
@@ -78,43 +118,9 @@ def generate_promo_filters_html(promo_list):
     return html_out
 
 def get_str_or_empty(x):
-    if pd.isna(x): return ""
+    if is_missing(x): return ""
     return str(x).strip()
 
-# --- LOAD CSV (With Safety Check) ---
-try:
-    df = pd.read_csv(IN_CSV)
-except FileNotFoundError:
-    print(f"Error: Input file '{IN_CSV}' not found. Stopping generator.")
-    sys.exit(0)
-
-if df.empty:
-    print(f"Warning: Input file '{IN_CSV}' is empty. Stopping generator.")
-    sys.exit(0)
-
-# --- PROCESS DATA ---
-df["orig_inc"] = df.get("Original Price", pd.Series(dtype=str)).apply(to_numeric_price)
-df["orig_ex"] = df["orig_inc"] / GST_RATE
-df["disc_inc"] = df.get("Discount Price", pd.Series(dtype=str)).apply(to_numeric_price)
-df["disc_ex"] = df["disc_inc"] / GST_RATE
-df.loc[df["disc_inc"].isna(), "disc_ex"] = pd.NA
-df["pct_raw"] = df.get("% Discount", pd.Series(dtype=str)).apply(get_str_or_empty)
-
-def compute_pct_numeric(row):
-    raw = (row.get("pct_raw") or "").strip()
-    if raw.upper() == "SPECIAL": return 100.0
-    orig = row.get("orig_ex")
-    disc = row.get("disc_ex")
-    if pd.notna(orig) and pd.notna(disc) and orig > 0: return (orig - disc) / orig * 100.0
-    if raw:
-        try: return float(raw.replace("%", "").replace(",", ""))
-        except: return None
-    return None
-
-df["pct_numeric"] = df.apply(compute_pct_numeric, axis=1)
-df["price_numeric"] = df["disc_ex"].fillna(df["orig_ex"])
-df = df[df["pct_numeric"].isna() | (df["pct_numeric"] >= 0)].reset_index(drop=True)
-
 CATEGORY_KEYWORDS = {
     "case": ["case","cover","shell","protector","skin","sleeve","screen guard","spigen","otterbox","uag"],
     "cable": ["cable","usb","hdmi","lightning","usb-c","ethernet","adapter"],
@@ -148,47 +154,268 @@ def detect_categories(name):
     if not found_cats: found_cats.add("other")
     return sorted(list(found_cats))
 
-deals_payload = []
-for idx, row in df.iterrows():
-    name_raw = str(row.get("Product name", "") or "")
-    part_raw = str(row.get("Part Number", "") or "")
-    promo_raw = str(row.get("PromoCode", "") or "")
-    link = str(row.get("Link", "") or "")
-    cats = detect_categories(name_raw)
-    orig_ex = row.get("orig_ex"); orig_inc = row.get("orig_inc")
-    disc_ex = row.get("disc_ex"); disc_inc = row.get("disc_inc")
-    pct_val = row.get("pct_numeric")
-    is_special = str(row.get("pct_raw","")).strip().upper() == "SPECIAL"
-    has_orig = not pd.isna(orig_ex)
-    is_unknown = (not is_special) and (not has_orig) and (str(row.get("pct_raw","")).strip() == "")
-    pct_text = "SPECIAL" if is_special else (fmt_pct(pct_val) if pd.notna(pct_val) else "")
-    deals_payload.append({
-        "n": name_raw, "p": part_raw, "l": link, "pr": promo_raw,
-        "oe": fmt_price(orig_ex), "oi": fmt_price(orig_inc),
-        "de": fmt_price(disc_ex), "di": fmt_price(disc_inc),
-        "pt": pct_text, "v": pct_val if pd.notna(pct_val) else 0,
-        "pv": row.get("price_numeric") if pd.notna(row.get("price_numeric")) else 0,
-        "c": ",".join(cats), "f": [1 if has_orig else 0, 1 if is_special else 0, 1 if is_unknown else 0]
-    })
-
-json_data = json.dumps(deals_payload)
-quick_filters_html = generate_quick_filters_html()
-unique_promos = sorted(df[df["PromoCode"].notna() & (df["PromoCode"] != "")]["PromoCode"].unique())
-promo_filters_html = generate_promo_filters_html(unique_promos)
-
-# ---- TIMEZONE FIX ----
-try:
-    nz_tz = pytz.timezone('Pacific/Auckland')
-    scrape_time_str = datetime.now(nz_tz).strftime("%d/%m/%Y @ %I:%M %p")
-except Exception as e:
-    scrape_time_str = datetime.now().strftime("%d/%m/%Y @ %I:%M %p UTC")
-
-try:
-    with open("whatsnew.txt", "r", encoding="utf-8") as f:
-        whats_new_content = html.escape(f.read()).replace("\n", "<br />")
-except: whats_new_content = "<i>whatsnew.txt not found.</i>"
-
-html_content = f"""<!doctype html>
+def process_rows(records):
+    """stdlib engine: adds the numeric/GST columns to each row dict and drops negative discounts."""
+    processed = []
+    for rec in records:
+        row = dict(rec)
+        orig_inc = row["orig_inc"] = to_numeric_price(rec.get("Original Price"))
+        disc_inc = row["disc_inc"] = to_numeric_price(rec.get("Discount Price"))
+        orig_ex = row["orig_ex"] = None if orig_inc is None else orig_inc / GST_RATE
+        disc_ex = row["disc_ex"] = None if disc_inc is None else disc_inc / GST_RATE
+        row["pct_raw"] = get_str_or_empty(rec.get("% Discount"))
+        pct = row["pct_numeric"] = compute_pct_numeric(row)
+        row["price_numeric"] = orig_ex if disc_ex is None else disc_ex
+        if pct is None or pct >= 0: processed.append(row)
+    return processed
+
+def process_dataframe(df):
+    """pandas engine: same as process_rows(), for a DataFrame. Returns row dicts."""
+    import pandas as pd
+    df["orig_inc"] = df.get("Original Price", pd.Series(dtype=str)).apply(to_numeric_price)
+    df["orig_ex"] = df["orig_inc"] / GST_RATE
+    df["disc_inc"] = df.get("Discount Price", pd.Series(dtype=str)).apply(to_numeric_price)
+    df["disc_ex"] = df["disc_inc"] / GST_RATE
+    df.loc[df["disc_inc"].isna(), "disc_ex"] = pd.NA
+    df["pct_raw"] = df.get("% Discount", pd.Series(dtype=str)).apply(get_str_or_empty)
+    df["pct_numeric"] = df.apply(compute_pct_numeric, axis=1)
+    df["price_numeric"] = df["disc_ex"].fillna(df["orig_ex"])
+    df = df[df["pct_numeric"].isna() | (df["pct_numeric"] >= 0)].reset_index(drop=True)
+    return [{k: (None if is_missing(v) else v) for k, v in rec.items()} for rec in df.to_dict("records")]
+
+def compute_pct_numeric(row):
+    raw = (row.get("pct_raw") or "").strip()
+    if raw.upper() == "SPECIAL": return 100.0
+    orig = row.get("orig_ex")
+    disc = row.get("disc_ex")
+    if not is_missing(orig) and not is_missing(disc) and orig > 0: return (orig - disc) / orig * 100.0
+    if raw:
+        try: return float(raw.replace("%", "").replace(",", ""))
+        except: return None
+    return None
+
+def build_deals_payload(rows, enrichment=None):
+    """`rows` are processed row dicts (from either engine). `enrichment` is the
+    ProductEnricher cache; its fields are added where present."""
+    enrichment = enrichment or {}
+    deals_payload = []
+    for row in rows:
+        name_raw = str(row.get("Product name", "") or "")
+        part_raw = str(row.get("Part Number", "") or "")
+        promo_raw = str(row.get("PromoCode", "") or "")
+        link = str(row.get("Link", "") or "")
+        cats = detect_categories(name_raw)
+        orig_ex = row.get("orig_ex"); orig_inc = row.get("orig_inc")
+        disc_ex = row.get("disc_ex"); disc_inc = row.get("disc_inc")
+        pct_val = row.get("pct_numeric")
+        is_special = str(row.get("pct_raw","")).strip().upper() == "SPECIAL"
+        has_orig = not is_missing(orig_ex)
+        is_unknown = (not is_special) and (not has_orig) and (str(row.get("pct_raw","")).strip() == "")
+        pct_text = "SPECIAL" if is_special else ("" if is_missing(pct_val) else fmt_pct(pct_val))
+        deals_payload.append({
+            "n": name_raw, "p": part_raw, "l": link, "pr": promo_raw,
+            "oe": fmt_price(orig_ex), "oi": fmt_price(orig_inc),
+            "de": fmt_price(disc_ex), "di": fmt_price(disc_inc),
+            "pt": pct_text, "v": 0 if is_missing(pct_val) else pct_val,
+            "pv": 0 if is_missing(row.get("price_numeric")) else row.get("price_numeric"),
+            "c": ",".join(cats), "f": [1 if has_orig else 0, 1 if is_special else 0, 1 if is_unknown else 0]
+        })
+        stock = cached_fields(enrichment, part_raw).get("Stock")
+        if stock: deals_payload[-1]["s"] = stock
+    return deals_payload
+
+# Sortable columns (the table headers' data-sort values) and their sort keys
+SORT_KEYS = {
+    "p": lambda d: d["p"].lower(),
+    "n": lambda d: d["n"].lower(),
+    "price": lambda d: d["pv"],
+    "v": lambda d: d["v"],
+}
+
+def build_sort_ranks(deals_payload):
+    """For each sortable column, the dense ascending rank of every deal (equal values share a rank).
+    The page sorts by these integers instead of comparing strings/floats."""
+    ranks = {}
+    for col, key in SORT_KEYS.items():
+        keys = [key(d) for d in deals_payload]
+        rank = [0] * len(keys)
+        r = -1; prev = None
+        for i in sorted(range(len(keys)), key=keys.__getitem__):
+            if r < 0 or keys[i] != prev: r += 1; prev = keys[i]
+            rank[i] = r
+        ranks[col] = rank
+    return ranks
+
+GOOGLE_ICON_SVG = '<svg style="width:16px;height:16px;fill:#999" viewBox="0 0 24 24"><path d="M21.35,11.1H12.18V13.83H18.69C18.36,17.64 15.19,19.27 12.19,19.27C8.36,19.27 5.03,16.21 5.03,12.2C5.03,8.19 8.36,5.13 12.19,5.13C14.4,5.13 15.9,6.02 16.6,6.68L18.6,4.71C16.8,3.08 14.6,2 12.19,2C6.92,2 2.76,6.13 2.76,12.2C2.76,18.27 6.92,22.4 12.19,22.4C17.6,22.4 21.5,18.52 21.5,12.49C21.5,11.91 21.43,11.5 21.35,11.1Z"></path></svg>'
+
+# Must match the page's default state (and the selected "Rows" option)
+DEFAULT_ROWS_PER_PAGE = 100
+
+def render_row_html(d):
+    """Same markup the page's makeRow()/fillRow() produce, with GST-inclusive prices."""
+    cls = "no-discount-row" if d["f"][2] else ("special-row" if d["f"][1] else "")
+    e = html.escape
+    promo_style = "" if d["pr"] else ' style="display: none;"'
+    google = "https://www.google.com/search?q=" + quote(d["n"], safe="")
+    return (f'<tr class="{cls}"><td style="font-family:monospace;color:#666">{e(d["p"])}</td>'
+            f'<td><a class="product-link" target="_blank" href="{e(d["l"])}">{e(d["n"])}</a><span class="stock">{e(d.get("s", ""))}</span></td>'
+            f'<td class="price" style="color:#666;text-decoration:line-through">{e(d["oi"])}</td><td class="price">{e(d["di"])}</td>'
+            f'<td class="discount">{e(d["pt"])}</td><td style="text-align:center"><span class="promo-code"{promo_style}>{e(d["pr"])}</span></td>'
+            f'<td style="text-align:center"><a target="_blank" href="{e(google)}">{GOOGLE_ICON_SVG}</a></td></tr>')
+
+def render_first_page(deals_payload, sort_ranks, rows_per_page=DEFAULT_ROWS_PER_PAGE):
+    """Server-side render of the default view: default filters, sorted by % off (desc).
+    Returns (rows html, total matching rows)."""
+    # Default filters: hide SPECIAL and unknown rows, 0-100% off, any price
+    visible = [i for i, d in enumerate(deals_payload) if not d["f"][1] and not d["f"][2] and 0 <= d["v"] <= 100 and d["pv"] >= 0]
+    # Same order as the page: highest rank first, ties in dataset order
+    rank = sort_ranks["v"]
+    visible.sort(key=lambda i: -rank[i])
+    return "".join(render_row_html(deals_payload[i]) for i in visible[:rows_per_page]), len(visible)
+
+def canonical_value(col, val):
+    if val is None or val != val: return ""  # None / NaN
+    if col in NUMERIC_COLUMNS:
+        try: return f"{float(str(val).replace('$', '').replace(',', '')):.2f}"
+        except ValueError: return str(val).strip().upper()
+    return str(val).strip()
+
+def dataset_hash(records):
+    """Hash of the normalised rows plus the other site inputs; the same data read from
+    the CSV or passed in memory gives the same hash."""
+    h = hashlib.sha256()
+    for rec in records:
+        h.update(json.dumps([canonical_value(c, rec.get(c)) for c in CSV_COLUMNS]).encode("utf-8"))
+        h.update(b"\n")
+    for path in SITE_INPUT_FILES:
+        try:
+            with open(path, "rb") as f: h.update(hashlib.sha256(f.read()).digest())
+        except OSError: h.update(b"<missing>")
+    return h.hexdigest()
+
+def read_timestamp_file():
+    try:
+        with open(TIMESTAMP_FILE, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def write_timestamp_file(content_hash):
+    with open(TIMESTAMP_FILE, "w", encoding="utf-8") as f:
+        json.dump({"updated": get_scrape_time_str(), "hash": content_hash}, f, indent=1)
+        f.write("\n")
+
+def get_nz_timezone():
+    # zoneinfo needs the OS tz database (or the tzdata package on Windows); pytz is the fallback
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo("Pacific/Auckland")
+    except Exception: pass
+    try:
+        import pytz
+        return pytz.timezone("Pacific/Auckland")
+    except Exception: return None
+
+def get_scrape_time_str():
+    # ---- TIMEZONE FIX ----
+    nz_tz = get_nz_timezone()
+    if nz_tz is None: return datetime.now(timezone.utc).strftime("%d/%m/%Y @ %I:%M %p UTC")
+    return datetime.now(nz_tz).strftime("%d/%m/%Y @ %I:%M %p")
+
+def read_whats_new():
+    try:
+        with open("whatsnew.txt", "r", encoding="utf-8") as f:
+            return html.escape(f.read()).replace("\n", "<br />")
+    except: return "<i>whatsnew.txt not found.</i>"
+
+DEALS_WORKER_JS = r"""
+// Runs in a Web Worker: the only place the dataset is parsed and held. Filters + sorts
+// off the main thread and posts back just the deals for the requested page (or, with
+// virtual scrolling, the requested window of rows).
+const GST_RATE = 1.15;
+const CHUNK = 2000;
+let deals = [], ranks = {}, orders = {}, searchText = [], promoLower = [];
+let latestId = 0, filterKey = null, sortKey = null, result = [];
+const yieldToMessages = () => new Promise(r => setTimeout(r, 0));
+function matcher(q) {
+    const term = q.searchQuery.toLowerCase().trim(); let regex = null; let textTokens = [];
+    if (term.includes('*')) { try { regex = new RegExp('^' + term.replace(/\*/g, '.*') + '$', 'i'); } catch(e){} } else { textTokens = term.split(/\s+/).filter(Boolean); }
+    const promos = new Set(q.activePromos); const allPromos = promos.has('all');
+    const limitMinPrice = q.showGst ? (q.minPrice / GST_RATE) : q.minPrice; const limitMaxPrice = q.showGst ? (q.maxPrice / GST_RATE) : q.maxPrice;
+    return i => {
+        const d = deals[i];
+        if (d.f[1] && !q.showSpecial) return false; if (d.f[2] && !q.showHidden) return false;
+        if (!allPromos && !promos.has(promoLower[i])) return false;
+        if (d.pv < limitMinPrice) return false; if (q.maxPrice !== Infinity && d.pv > limitMaxPrice) return false; if (d.v < q.minPct) return false; if (d.v > q.maxPct) return false;
+        if (term) { if (regex) { if (!regex.test(d.p)) return false; } else if (textTokens.length > 0) { const s = searchText[i]; if (!textTokens.every(t => s.includes(t))) return false; } }
+        return true;
+    };
+}
+// Deal indices in ascending rank order (ties by index), via counting sort over the precomputed ranks
+function buildOrder(rank) {
+    let max = -1; for (let i = 0; i < rank.length; i++) if (rank[i] > max) max = rank[i];
+    const starts = new Int32Array(max + 2); for (let i = 0; i < rank.length; i++) starts[rank[i] + 1]++;
+    for (let r = 1; r < starts.length; r++) starts[r] += starts[r - 1];
+    const order = new Int32Array(rank.length); for (let i = 0; i < rank.length; i++) order[starts[rank[i]]++] = i;
+    return order;
+}
+function sortResult(col, dirName) {
+    const rank = ranks[col]; const asc = dirName === 'asc';
+    if (result.length * 8 < deals.length) {
+        // Small subset: integer-keyed sort
+        result.sort(asc ? ((a, b) => rank[a] - rank[b] || a - b) : ((a, b) => rank[b] - rank[a] || a - b));
+        return;
+    }
+    // Large subset: one linear pass over the full rank order, keeping members of the result
+    const order = orders[col]; const mask = new Uint8Array(deals.length); for (const i of result) mask[i] = 1;
+    const out = [];
+    if (asc) { for (let k = 0; k < order.length; k++) if (mask[order[k]]) out.push(order[k]); }
+    else {
+        // Walk rank groups from the top down, but keep ties in index order
+        let hi = order.length - 1;
+        while (hi >= 0) {
+            const r = rank[order[hi]]; let lo = hi; while (lo > 0 && rank[order[lo - 1]] === r) lo--;
+            for (let k = lo; k <= hi; k++) if (mask[order[k]]) out.push(order[k]);
+            hi = lo - 1;
+        }
+    }
+    result = out;
+}
+async function runQuery(q) {
+    const key = JSON.stringify([q.searchQuery, q.minPct, q.maxPct, q.minPrice, q.maxPrice, q.showHidden, q.showSpecial, q.showGst, q.activePromos]);
+    if (key !== filterKey) {
+        const test = matcher(q); const out = [];
+        for (let start = 0; start < deals.length; start += CHUNK) {
+            // Let newer messages in between chunks; drop this query if one arrived
+            if (start > 0) { await yieldToMessages(); if (q.id !== latestId) return; }
+            const end = Math.min(start + CHUNK, deals.length);
+            for (let i = start; i < end; i++) if (test(i)) out.push(i);
+        }
+        result = out; filterKey = key; sortKey = null;
+    }
+    const newSortKey = q.sortCol + ':' + q.sortDir;
+    if (newSortKey !== sortKey) { sortResult(q.sortCol, q.sortDir); sortKey = newSortKey; }
+    // rowsPerPage 0 means virtual scrolling: the rows [q.from, q.to) of the whole result
+    const total = result.length; let page = 1, start, end;
+    if (q.rowsPerPage > 0) {
+        page = Math.min(Math.max(1, q.page), Math.max(1, Math.ceil(total / q.rowsPerPage)));
+        start = (page - 1) * q.rowsPerPage; end = start + q.rowsPerPage;
+    } else { start = Math.min(Math.max(0, q.from), total); end = q.to; }
+    const rows = result.slice(start, end).map(i => deals[i]);
+    self.postMessage({ id: q.id, total: total, page: page, from: start, rows: rows });
+}
+self.onmessage = (e) => {
+    const m = e.data;
+    if (m.type === 'init') {
+        const payload = JSON.parse(m.json); deals = payload.d; ranks = payload.r;
+        for (const col in ranks) orders[col] = buildOrder(ranks[col]);
+        for (let i = 0; i < deals.length; i++) { const d = deals[i]; searchText[i] = (d.n + " " + d.p + " " + d.c).toLowerCase(); promoLower[i] = (d.pr || "").toLowerCase(); }
+        return;
+    }
+    latestId = m.id; runQuery(m);
+};
+"""
+
+def render_html(json_data, quick_filters_html, promo_filters_html, whats_new_content, first_page_html="", first_page_total=0):
+    return f"""<!doctype html>
 <html lang="en">
 <head>
 <meta charset="utf-8"/>
@@ -231,7 +458,14 @@ html_content = f"""<!doctype html>
   tr.no-discount-row {{ background: var(--no-discount-bg); }} tr.special-row {{ background: var(--special-bg); }}
   .price {{ font-family: monospace; font-size: 15px; font-weight: 600; }}
   .discount {{ color: #d32f2f; font-weight: 700; }} :root.dark .discount {{ color: #ff6b6b; }}
+  .stock {{ margin-left: 8px; font-size: 11px; color: #888; white-space: nowrap; }}
   a.product-link {{ color: var(--text); text-decoration: none; font-weight: 600; }} a.product-link:hover {{ color: var(--pb-orange); }}
+  tr.spacer td {{ padding: 0; border: 0; height: inherit; }}
+  #tableWrap.virtual {{ max-height: 75vh; overflow-y: auto; }}
+  #tableWrap.virtual table {{ table-layout: fixed; overflow: visible; }}
+  #tableWrap.virtual th {{ position: sticky; top: 0; z-index: 1; }}
+  #tableWrap.virtual tr:not(.spacer) td {{ height: 40px; box-sizing: border-box; padding-top: 0; padding-bottom: 0; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+  #tableWrap.virtual th:nth-child(1) {{ width: 130px; }} #tableWrap.virtual th:nth-child(3), #tableWrap.virtual th:nth-child(4) {{ width: 110px; }} #tableWrap.virtual th:nth-child(5) {{ width: 80px; }} #tableWrap.virtual th:nth-child(6) {{ width: 110px; }} #tableWrap.virtual th:nth-child(7) {{ width: 40px; }}
   .controls-pagination {{ display: flex; justify-content: space-between; padding: 15px; background: var(--card); border: 1px solid var(--border); border-radius: 4px; margin-top: 15px; align-items: center; }}
   .pagination-btns button {{ padding: 6px 12px; background: white; border: 1px solid #ccc; color: #333; border-radius: 3px; cursor: pointer; }} :root.dark .pagination-btns button {{ background: #333; border-color: #555; color: #eee; }}
   .quick-filter-menu-container {{ margin-top: 15px; border-top: 1px solid rgba(255,255,255,0.2); padding-top: 10px; }}
@@ -273,7 +507,7 @@ html_content = f"""<!doctype html>
 <div class="container">
   <header>
     <div class="header-top">
-      <div><h1>PBTech Deals Filterer</h1><div class="scrape-time">Last updated: {scrape_time_str}</div></div>
+      <div><h1>PBTech Deals Filterer</h1><div class="scrape-time">Last updated: <span id="scrapeTime"></span></div></div>
       <div style="display:flex; gap:10px">
         <button class="btn secondary" id="whatsNewBtn">What's New</button>
         <a href="https://www.buymeacoffee.com/polobaggyo" target="_blank" class="btn">☕ Coffee</a>
@@ -290,7 +524,7 @@ html_content = f"""<!doctype html>
       <div class="desktop-group" style="margin-top:10px; width:100%; justify-content:space-between;">
          <div class="mobile-row" style="flex-grow:1; gap:10px; display:flex;"><input id="minPrice" type="number" min="0" placeholder="Min $" style="width:80px"><input id="maxPrice" type="number" min="0" placeholder="Max $" style="width:80px"></div>
          <div style="display:flex; gap:15px; color:rgba(255,255,255,0.9); font-size:13px; flex-wrap:wrap;">
-            <label><input type="checkbox" id="toggleHidden"> Show Unknown</label><label><input type="checkbox" id="toggleSpecial"> Show SPECIAL</label><label><input type="checkbox" id="toggleGST" checked> GST Inc.</label><span>Found: <b id="totalCount">0</b></span>
+            <label><input type="checkbox" id="toggleHidden"> Show Unknown</label><label><input type="checkbox" id="toggleSpecial"> Show SPECIAL</label><label><input type="checkbox" id="toggleGST" checked> GST Inc.</label><span>Found: <b id="totalCount">{first_page_total}</b></span>
          </div>
       </div>
     </div>
@@ -299,71 +533,115 @@ html_content = f"""<!doctype html>
     {promo_filters_html}
   </header>
   <div class="controls-pagination">
-      <div style="display:flex; align-items:center; gap:10px;"><label class="small" style="color:var(--text)">Rows:</label><select id="rowsPerPage"><option value="50">50</option><option value="100" selected>100</option><option value="200">200</option><option value="500">500</option><option value="1000">1000</option></select><input type="number" id="customRows" placeholder="Custom" style="width:70px" min="1"></div>
-      <div id="pageInfo" style="font-size:14px; font-weight:600;">0-0 of 0</div>
+      <div style="display:flex; align-items:center; gap:10px;"><label class="small" style="color:var(--text)">Rows:</label><select id="rowsPerPage"><option value="50">50</option><option value="100" selected>100</option><option value="200">200</option><option value="500">500</option><option value="1000">1000</option><option value="all">All (scroll)</option></select><input type="number" id="customRows" placeholder="Custom" style="width:70px" min="1"></div>
+      <div id="pageInfo" style="font-size:14px; font-weight:600;">{min(1, first_page_total)}-{min(DEFAULT_ROWS_PER_PAGE, first_page_total)} of {first_page_total}</div>
       <div class="pagination-btns"><button id="btnFirst">«</button><button id="btnPrev">‹ Prev</button><button id="btnNext">Next ›</button><button id="btnLast">»</button></div>
   </div>
-  <div style="overflow:auto; margin-top:10px;">
-  <table id="dealsTable"><thead><tr><th data-sort="p">Part #</th><th data-sort="n">Product Name</th><th data-sort="price">Original</th><th data-sort="price">Discounted</th><th data-sort="v">% Off</th><th>Promo</th><th>G</th></tr></thead><tbody id="tableBody"></tbody></table>
+  <div id="tableWrap" style="overflow:auto; margin-top:10px;">
+  <table id="dealsTable"><thead><tr><th data-sort="p">Part #</th><th data-sort="n">Product Name</th><th data-sort="price">Original</th><th data-sort="price">Discounted</th><th data-sort="v">% Off</th><th>Promo</th><th>G</th></tr></thead><tbody id="tableBody"><tr id="topSpacer" class="spacer"><td colspan="7"></td></tr>{first_page_html}<tr id="bottomSpacer" class="spacer"><td colspan="7"></td></tr></tbody></table>
   </div>
   <div class="footer small" style="margin-top:20px;text-align:center; color:#888;">Site Designed and Coded by <a href="https://www.cheapies.nz/user/3665" target="_blank" style="color:var(--pb-orange)">PolobaggYo aka GeorgeOfTheJungle</a></div>
 </div>
 <div id="whatsNewModal" class="modal-overlay" style="display: none;"><div class="modal-content"><div class="modal-header"><h2>What's New</h2><button id="closeWhatsNewBtn" style="border:none;background:none;font-size:20px;cursor:pointer">&times;</button></div><div class="modal-body">{whats_new_content}</div></div></div>
+<script id="dealsData" type="application/json">{json_data}</script>
+<script id="dealsWorker" type="text/js-worker">{DEALS_WORKER_JS}</script>
 <script>
-const allDeals = {json_data};
 const GST_RATE = 1.15;
-const googleIconSvg = '<svg style="width:16px;height:16px;fill:#999" viewBox="0 0 24 24"><path d="M21.35,11.1H12.18V13.83H18.69C18.36,17.64 15.19,19.27 12.19,19.27C8.36,19.27 5.03,16.21 5.03,12.2C5.03,8.19 8.36,5.13 12.19,5.13C14.4,5.13 15.9,6.02 16.6,6.68L18.6,4.71C16.8,3.08 14.6,2 12.19,2C6.92,2 2.76,6.13 2.76,12.2C2.76,18.27 6.92,22.4 12.19,22.4C17.6,22.4 21.5,18.52 21.5,12.49C21.5,11.91 21.43,11.5 21.35,11.1Z"></path></svg>';
-let state = {{ filtered: [], currentPage: 1, rowsPerPage: 100, sortCol: 'v', sortDir: 'desc', searchQuery: '', minPct: 0, maxPct: 100, minPrice: 0, maxPrice: Infinity, showHidden: false, showSpecial: false, showGst: true, activePromos: new Set(['all']) }};
+const googleIconSvg = '{GOOGLE_ICON_SVG}';
+let state = {{ pageRows: [], rowsFrom: 0, total: 0, currentPage: 1, rowsPerPage: {DEFAULT_ROWS_PER_PAGE}, virtual: false, sortCol: 'v', sortDir: 'desc', searchQuery: '', minPct: 0, maxPct: 100, minPrice: 0, maxPrice: Infinity, showHidden: false, showSpecial: false, showGst: true, activePromos: new Set(['all']) }};
 const tbody = document.getElementById('tableBody'); const countEl = document.getElementById('totalCount'); const pageInfoEl = document.getElementById('pageInfo');
-function init() {{ state.filtered = [...allDeals]; applyFilters(); setupListeners(); }}
-function escapeHtml(text) {{ if (!text) return ''; return text.replace(/&/g, "&amp;").replace(/</g, "&lt;").replace(/>/g, "&gt;").replace(/"/g, "&quot;").replace(/'/g, "&#039;"); }}
+// The timestamp lives in a separate file so index.html only changes when the data does
+fetch('{TIMESTAMP_FILE}', {{ cache: 'no-cache' }}).then(r => r.json()).then(t => {{ document.getElementById('scrapeTime').textContent = t.updated; }}).catch(() => {{}});
+// Filtering/sorting runs in a worker; each request gets an id and stale replies are ignored
+const worker = new Worker(URL.createObjectURL(new Blob([document.getElementById('dealsWorker').textContent], {{ type: 'text/javascript' }})));
+let queryId = 0; let pendingRange = null;
+worker.onmessage = (e) => {{ const m = e.data; if (m.id !== queryId) return; pendingRange = null; state.pageRows = m.rows; state.rowsFrom = m.from; state.total = m.total; state.currentPage = m.page; renderPage(); }};
+function init() {{
+    // The default first page is already server-rendered; adopt its rows into the pool so the first real render just refills them
+    tbody.querySelectorAll('tr:not(.spacer)').forEach(tr => rowPool.push(tr)); mountedRows = rowPool.length;
+    // The JSON text goes straight to the worker; the main thread never parses or keeps the dataset
+    const dealsEl = document.getElementById('dealsData'); worker.postMessage({{ type: 'init', json: dealsEl.textContent }}); dealsEl.remove();
+    applyFilters(); setupListeners();
+}}
+// Rows are recycled <tr> nodes from a pool; only their text/attributes change between renders
+const rowPool = []; let mountedRows = 0;
+const topSpacer = document.getElementById('topSpacer'); const bottomSpacer = document.getElementById('bottomSpacer');
+const tableWrap = document.getElementById('tableWrap'); const VIRTUAL_OVERSCAN = 10; let rowHeight = 41; let scrollQueued = false;
+// Virtual scrolling asks the worker for this many extra rows either side of the viewport
+const VIRTUAL_MARGIN = 200;
+function makeRow() {{
+    const tr = document.createElement('tr');
+    tr.innerHTML = `<td style="font-family:monospace;color:#666"></td><td><a class="product-link" target="_blank"></a><span class="stock"></span></td><td class="price" style="color:#666;text-decoration:line-through"></td><td class="price"></td><td class="discount"></td><td style="text-align:center"><span class="promo-code"></span></td><td style="text-align:center"><a target="_blank">${{googleIconSvg}}</a></td>`;
+    return tr;
+}}
+function fillRow(tr, d) {{
+    const c = tr.cells; tr.className = d.f[2] ? 'no-discount-row' : (d.f[1] ? 'special-row' : '');
+    c[0].textContent = d.p; const link = c[1].firstChild; link.href = d.l; link.textContent = d.n; c[1].lastChild.textContent = d.s || '';
+    c[2].textContent = state.showGst ? d.oi : d.oe; c[3].textContent = state.showGst ? d.di : d.de; c[4].textContent = d.pt;
+    const promo = c[5].firstChild; promo.textContent = d.pr; promo.style.display = d.pr ? '' : 'none';
+    c[6].firstChild.href = `https://www.google.com/search?q=${{encodeURIComponent(d.n)}}`;
+}}
+function renderRows(rows, from, to) {{
+    const count = Math.max(0, to - from);
+    while (rowPool.length < count) rowPool.push(makeRow());
+    for (let k = 0; k < count; k++) fillRow(rowPool[k], rows[from + k]);
+    while (mountedRows < count) tbody.insertBefore(rowPool[mountedRows++], bottomSpacer);
+    while (mountedRows > count) tbody.removeChild(rowPool[--mountedRows]);
+}}
 function renderPage() {{
-    const start = (state.currentPage - 1) * state.rowsPerPage; const end = start + state.rowsPerPage; const slice = state.filtered.slice(start, end); let html = '';
-    slice.forEach(d => {{
-        let rowClass = ''; if (d.f[2]) rowClass = 'no-discount-row'; else if (d.f[1]) rowClass = 'special-row';
-        const googleLink = `https://www.google.com/search?q=${{encodeURIComponent(d.n)}}`; const origDisplay = state.showGst ? d.oi : d.oe; const discDisplay = state.showGst ? d.di : d.de; const promoHtml = d.pr ? `<span class="promo-code">${{escapeHtml(d.pr)}}</span>` : '';
-        html += `<tr class="${{rowClass}}"><td style="font-family:monospace;color:#666">${{escapeHtml(d.p)}}</td><td><a class="product-link" href="${{d.l}}" target="_blank">${{escapeHtml(d.n)}}</a></td><td class="price" style="color:#666;text-decoration:line-through">${{origDisplay}}</td><td class="price">${{discDisplay}}</td><td class="discount">${{d.pt}}</td><td style="text-align:center">${{promoHtml}}</td><td style="text-align:center"><a href="${{googleLink}}" target="_blank">${{googleIconSvg}}</a></td></tr>`;
-    }});
-    tbody.innerHTML = html; updatePaginationUI();
+    if (state.virtual) {{ renderVirtual(); return; }}
+    topSpacer.style.height = '0px'; bottomSpacer.style.height = '0px';
+    renderRows(state.pageRows, 0, state.pageRows.length); updatePaginationUI();
+}}
+function viewRange() {{
+    // Result rows in (and just around) the viewport
+    const top = Math.max(0, tableWrap.scrollTop - tbody.offsetTop);
+    return [Math.max(0, Math.floor(top / rowHeight) - VIRTUAL_OVERSCAN), Math.ceil((top + tableWrap.clientHeight) / rowHeight) + VIRTUAL_OVERSCAN];
+}}
+function renderVirtual() {{
+    // Only the rows in (and just around) the viewport are in the DOM; spacers stand in for the rest
+    const total = state.total; const top = Math.max(0, tableWrap.scrollTop - tbody.offsetTop);
+    const view = viewRange(); const last = Math.min(total, view[1]); const first = Math.min(view[0], last);
+    // The worker only sent a window of rows; ask for the next one once the viewport leaves it
+    const haveFrom = state.rowsFrom; const haveTo = haveFrom + state.pageRows.length;
+    if ((first < haveFrom || last > haveTo) && !(pendingRange && pendingRange[0] <= first && last <= pendingRange[1])) requestPage();
+    const from = Math.min(Math.max(first, haveFrom), last); const to = Math.max(from, Math.min(last, haveTo));
+    topSpacer.style.height = (from * rowHeight) + 'px'; bottomSpacer.style.height = ((total - to) * rowHeight) + 'px';
+    renderRows(state.pageRows, from - haveFrom, to - haveFrom);
+    if (mountedRows > 0 && rowPool[0].offsetHeight && rowPool[0].offsetHeight !== rowHeight) {{ rowHeight = rowPool[0].offsetHeight; renderVirtual(); return; }}
+    const shownFirst = Math.min(total, Math.floor(top / rowHeight) + 1); const shownLast = Math.min(total, Math.ceil((top + tableWrap.clientHeight) / rowHeight));
+    pageInfoEl.textContent = `${{total===0?0:shownFirst}}-${{shownLast}} of ${{total}}`; countEl.textContent = total;
+}}
+function setVirtual(on) {{
+    state.virtual = on; state.currentPage = 1; tableWrap.scrollTop = 0;
+    tableWrap.classList.toggle('virtual', on); document.querySelector('.pagination-btns').style.display = on ? 'none' : '';
 }}
 function updatePaginationUI() {{
-    const total = state.filtered.length; const start = (state.currentPage - 1) * state.rowsPerPage + 1; const end = Math.min(start + state.rowsPerPage - 1, total);
+    const total = state.total; const start = (state.currentPage - 1) * state.rowsPerPage + 1; const end = Math.min(start + state.rowsPerPage - 1, total);
     pageInfoEl.textContent = `${{total===0?0:start}}-${{end}} of ${{total}}`; countEl.textContent = total;
     document.getElementById('btnPrev').disabled = state.currentPage === 1; document.getElementById('btnFirst').disabled = state.currentPage === 1;
     const maxPage = Math.ceil(total / state.rowsPerPage); document.getElementById('btnNext').disabled = state.currentPage >= maxPage || maxPage === 0; document.getElementById('btnLast').disabled = state.currentPage >= maxPage || maxPage === 0;
 }}
-function applyFilters() {{
-    const s = state; const term = s.searchQuery.toLowerCase().trim(); let regex = null; let textTokens = [];
-    if (term.includes('*')) {{ try {{ regex = new RegExp('^' + term.replace(/\*/g, '.*') + '$', 'i'); }} catch(e){{}} }} else {{ textTokens = term.split(/\s+/).filter(Boolean); }}
-    const limitMinPrice = s.showGst ? (s.minPrice / GST_RATE) : s.minPrice; const limitMaxPrice = s.showGst ? (s.maxPrice / GST_RATE) : s.maxPrice;
-    state.filtered = allDeals.filter(d => {{
-        if (d.f[1] && !s.showSpecial) return false; if (d.f[2] && !s.showHidden) return false;
-        if (!s.activePromos.has('all')) {{ const pLower = (d.pr || "").toLowerCase(); if (!s.activePromos.has(pLower)) return false; }}
-        if (d.pv < limitMinPrice) return false; if (s.maxPrice !== Infinity && d.pv > limitMaxPrice) return false; if (d.v < s.minPct) return false; if (d.v > s.maxPct) return false;
-        if (term) {{ const searchStr = (d.n + " " + d.p + " " + d.c).toLowerCase(); if (regex) {{ if (!regex.test(d.p)) return false; }} else if (textTokens.length > 0) {{ if (!textTokens.every(t => searchStr.includes(t))) return false; }} }}
-        return true;
-    }});
-    state.currentPage = 1; sortData();
-}}
-function sortData() {{
-    const col = state.sortCol; const dir = state.sortDir === 'asc' ? 1 : -1;
-    state.filtered.sort((a, b) => {{
-        let valA, valB; if (col === 'price') {{ valA = a.pv; valB = b.pv; }} else if (col === 'v') {{ valA = a.v; valB = b.v; }} else if (col === 'n') {{ valA = a.n.toLowerCase(); valB = b.n.toLowerCase(); }} else if (col === 'p') {{ valA = a.p.toLowerCase(); valB = b.p.toLowerCase(); }}
-        if (valA < valB) return -1 * dir; if (valA > valB) return 1 * dir; return 0;
-    }});
-    renderPage();
+function requestPage() {{
+    const s = state; queryId++; let from = 0, to = 0;
+    if (s.virtual) {{ const view = viewRange(); from = Math.max(0, view[0] - VIRTUAL_MARGIN); to = view[1] + VIRTUAL_MARGIN; pendingRange = [from, to]; }}
+    worker.postMessage({{ id: queryId, page: s.currentPage, rowsPerPage: s.virtual ? 0 : s.rowsPerPage, from: from, to: to, sortCol: s.sortCol, sortDir: s.sortDir, searchQuery: s.searchQuery, minPct: s.minPct, maxPct: s.maxPct, minPrice: s.minPrice, maxPrice: s.maxPrice, showHidden: s.showHidden, showSpecial: s.showSpecial, showGst: s.showGst, activePromos: [...s.activePromos].sort() }});
 }}
+function applyFilters() {{ state.currentPage = 1; tableWrap.scrollTop = 0; requestPage(); }}
+function sortData() {{ requestPage(); }}
 function setupListeners() {{
     document.querySelectorAll('th[data-sort]').forEach(th => {{ th.addEventListener('click', () => {{ const col = th.dataset.sort; if (state.sortCol === col) {{ state.sortDir = state.sortDir === 'asc' ? 'desc' : 'asc'; }} else {{ state.sortCol = col; state.sortDir = 'desc'; }} document.querySelectorAll('th').forEach(h => h.classList.remove('sort-asc', 'sort-desc')); th.classList.add(state.sortDir === 'asc' ? 'sort-asc' : 'sort-desc'); sortData(); }}); }});
-    document.getElementById('btnNext').addEventListener('click', () => {{ const max = Math.ceil(state.filtered.length / state.rowsPerPage); if (state.currentPage < max) {{ state.currentPage++; renderPage(); }} }});
-    document.getElementById('btnPrev').addEventListener('click', () => {{ if (state.currentPage > 1) {{ state.currentPage--; renderPage(); }} }});
-    document.getElementById('btnFirst').addEventListener('click', () => {{ state.currentPage = 1; renderPage(); }});
-    document.getElementById('btnLast').addEventListener('click', () => {{ state.currentPage = Math.ceil(state.filtered.length / state.rowsPerPage); renderPage(); }});
+    document.getElementById('btnNext').addEventListener('click', () => {{ const max = Math.ceil(state.total / state.rowsPerPage); if (state.currentPage < max) {{ state.currentPage++; requestPage(); }} }});
+    document.getElementById('btnPrev').addEventListener('click', () => {{ if (state.currentPage > 1) {{ state.currentPage--; requestPage(); }} }});
+    document.getElementById('btnFirst').addEventListener('click', () => {{ state.currentPage = 1; requestPage(); }});
+    document.getElementById('btnLast').addEventListener('click', () => {{ state.currentPage = Math.ceil(state.total / state.rowsPerPage); requestPage(); }});
     const rowsSel = document.getElementById('rowsPerPage'); const rowsCust = document.getElementById('customRows');
-    rowsSel.addEventListener('change', (e) => {{ rowsCust.value = ""; state.rowsPerPage = parseInt(e.target.value); state.currentPage = 1; renderPage(); }});
-    rowsCust.addEventListener('input', (e) => {{ const val = parseInt(e.target.value); if (val && val > 0) {{ state.rowsPerPage = val; state.currentPage = 1; renderPage(); }} }});
+    rowsSel.addEventListener('change', (e) => {{ rowsCust.value = ""; if (e.target.value === 'all') {{ setVirtual(true); }} else {{ setVirtual(false); state.rowsPerPage = parseInt(e.target.value); }} requestPage(); }});
+    rowsCust.addEventListener('input', (e) => {{ const val = parseInt(e.target.value); if (val && val > 0) {{ if (state.virtual) {{ setVirtual(false); rowsSel.value = '100'; }} state.rowsPerPage = val; state.currentPage = 1; requestPage(); }} }});
+    tableWrap.addEventListener('scroll', () => {{ if (!state.virtual || scrollQueued) return; scrollQueued = true; requestAnimationFrame(() => {{ scrollQueued = false; renderVirtual(); }}); }}, {{ passive: true }});
+    window.addEventListener('resize', () => {{ if (state.virtual) renderVirtual(); }});
     const debounce = (fn, delay) => {{ let t; return (...args) => {{ clearTimeout(t); t = setTimeout(() => fn(...args), delay); }}; }};
-    const runFilter = debounce(() => applyFilters(), 300);
+    const runFilter = debounce(() => applyFilters(), 150);
     document.getElementById('searchInput').addEventListener('input', (e) => {{ state.searchQuery = e.target.value; runFilter(); }});
     document.getElementById('minDiscount').addEventListener('input', (e) => {{ state.minPct = parseFloat(e.target.value)||0; runFilter(); }});
     document.getElementById('maxDiscount').addEventListener('input', (e) => {{ state.maxPct = parseFloat(e.target.value)||100; runFilter(); }});
@@ -386,13 +664,69 @@ function setupListeners() {{
     document.getElementById('closeWhatsNewBtn').addEventListener('click', () => modal.style.display = 'none');
     modal.addEventListener('click', (e) => {{ if (e.target === modal) modal.style.display = 'none'; }});
 }}
-init();
+// Let the browser paint the pre-rendered page before parsing the full dataset
+requestAnimationFrame(() => setTimeout(init, 0));
 </script>
 </body>
 </html>
 """
 
-with open(OUT_HTML, "w", encoding="utf-8") as f:
-    f.write(html_content)
+def generate_site(rows=None, in_csv=IN_CSV, out_html=OUT_HTML, force=False, engine="stdlib"):
+    """Builds index.html from `rows` (list of row dicts) or, if not given, from `in_csv`.
+    `engine` is "stdlib" or "pandas" (see ENGINES above).
+    Skips the rebuild if the data and site inputs hash the same as last time.
+    Returns False if there was nothing to generate."""
+    if engine not in ENGINES: raise ValueError(f"Unknown engine '{engine}' (expected one of {', '.join(ENGINES)})")
+
+    # --- LOAD DATA (With Safety Check) ---
+    if engine == "pandas":
+        import pandas as pd
+        if rows is None and not os.path.exists(in_csv): df = None
+        else: df = pd.read_csv(in_csv) if rows is None else pd.DataFrame(list(rows))
+        records = None if df is None else df.reindex(columns=CSV_COLUMNS).to_dict("records")
+    else:
+        if rows is None and not os.path.exists(in_csv): records = None
+        else: records = read_rows(in_csv) if rows is None else list(rows)
+
+    if records is None:
+        print(f"Error: Input file '{in_csv}' not found. Stopping generator.")
+        return False
+    if not records:
+        print("Warning: Input data is empty. Stopping generator.")
+        return False
+
+    content_hash = dataset_hash(records)
+    if not force and read_timestamp_file().get("hash") == content_hash and os.path.exists(out_html):
+        print(f"Data unchanged since last build. Keeping existing {out_html}.")
+        return True
+
+    # --- PROCESS DATA ---
+    processed = process_dataframe(df) if engine == "pandas" else process_rows(records)
+    deals_payload = build_deals_payload(processed, load_cache())
+    sort_ranks = build_sort_ranks(deals_payload)
+    # Escape "</" so the JSON can sit inside a <script> tag
+    json_data = json.dumps({"d": deals_payload, "r": sort_ranks}).replace("</", "<\\/")
+    first_page_html, first_page_total = render_first_page(deals_payload, sort_ranks)
+    quick_filters_html = generate_quick_filters_html()
+    unique_promos = sorted({r["PromoCode"] for r in processed if not is_missing(r.get("PromoCode")) and r["PromoCode"] != ""})
+    promo_filters_html = generate_promo_filters_html(unique_promos)
+
+    html_content = render_html(json_data, quick_filters_html, promo_filters_html, read_whats_new(), first_page_html, first_page_total)
+    with open(out_html, "w", encoding="utf-8", newline="\n") as f:
+        f.write(html_content)
+    write_timestamp_file(content_hash)
+
+    print(f"✅ Generated {out_html} successfully.")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description=f"Generate {OUT_HTML} from {IN_CSV}.")
+    parser.add_argument("--engine", choices=ENGINES, default="stdlib", help="row processing engine (default stdlib; pandas must be installed for pandas)")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the data is unchanged")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    generate_site(force=args.force, engine=args.engine)
+    print(f"Done in {time.perf_counter() - start:.2f}s ({args.engine} engine).")
 
-print(f"✅ Generated {OUT_HTML} successfully.")
+if __name__ == "__main__":
+    main()
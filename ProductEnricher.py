@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+ProductEnricher.py
+
+Optional enrichment stage: fetches product pages (the 'Link' column) for
+details the listing cards don't show, such as stock status, and keeps
+them in a persistent cache so the site generator can use them without
+fetching anything.
+
+CACHE:
+- 'product_cache.json', keyed by Part Number. Each entry stores when it
+  was fetched, the price/promo the row had at the time and the fields.
+- A product is (re)fetched only if it is new, its entry is older than
+  CACHE_TTL_HOURS, or its discount price or promo changed since then.
+
+FETCHING:
+- One stealth browser, at most CONCURRENCY product pages in flight.
+- At most MAX_FETCHES_PER_RUN pages per run; the rest wait for the next run.
+"""
+
+import json
+import random
+import re
+import time
+
+# --- CONFIGURATION ---
+
+CACHE_FILE = "product_cache.json"
+CACHE_TTL_HOURS = 72
+CONCURRENCY = 4
+MAX_FETCHES_PER_RUN = 500
+
+# --- END CONFIGURATION ---
+
+STOCK_PATTERNS = [
+    ("Out of stock", re.compile(r"out of stock|sold out|no stock|unavailable", re.I)),
+    ("Pre-order", re.compile(r"pre-?order", re.I)),
+    ("Limited stock", re.compile(r"limited stock|low stock|last \d+|only \d+ left", re.I)),
+    ("In stock", re.compile(r"in stock|available now|ready to ship", re.I)),
+]
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f: return json.load(f)
+    except (OSError, ValueError): return {}
+
+def save_cache(cache, path=CACHE_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+def cached_fields(cache, part_num):
+    """The enrichment fields for a Part Number ({} if never fetched)."""
+    entry = cache.get(str(part_num or "").strip())
+    return entry.get("fields", {}) if entry else {}
+
+def needs_fetch(row, entry, now, ttl_hours=CACHE_TTL_HOURS):
+    if not entry: return True
+    if now - entry.get("fetched", 0) > ttl_hours * 3600: return True
+    return entry.get("price") != row.get("Discount Price") or entry.get("promo") != row.get("PromoCode")
+
+def classify_stock(text):
+    for label, pattern in STOCK_PATTERNS:
+        if pattern.search(text): return label
+    return None
+
+def extract_product_details(soup):
+    fields = {}
+    # Availability sits in blocks whose class names mention stock/availability
+    for el in soup.select("[class*='stock'], [class*='availability'], [class*='Stock']"):
+        stock = classify_stock(el.get_text(" ", strip=True))
+        if stock:
+            fields["Stock"] = stock
+            break
+    return fields
+
+
+async def fetch_details(rows, concurrency=CONCURRENCY):
+    """Fetches each row's product page, at most `concurrency` at a time.
+    Returns {part number: fields} for the pages that loaded."""
+    # Heavy imports only when we actually fetch
+    import asyncio
+    from bs4 import BeautifulSoup
+    from playwright.async_api import async_playwright
+    from GithubVersionScraper import launch_stealth_browser
+
+    results = {}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch_one(context, row):
+        part_num = str(row["Part Number"]).strip()
+        async with semaphore:
+            page = await context.new_page()
+            try:
+                await page.goto(row["Link"], timeout=60000, wait_until="domcontentloaded")
+                soup = BeautifulSoup(await page.content(), "lxml")
+                results[part_num] = extract_product_details(soup)
+            except Exception as e:
+                print(f"[enrich] {part_num}: {e}", flush=True)
+            finally:
+                await page.close()
+            # Same polite pacing as the listing scraper
+            await asyncio.sleep(random.uniform(1.0, 3.0))
+
+    async with async_playwright() as p:
+        browser, context = await launch_stealth_browser(p)
+        try:
+            await asyncio.gather(*(fetch_one(context, row) for row in rows))
+        finally:
+            await browser.close()
+    return results
+
+def enrich_rows(rows, cache_path=CACHE_FILE, max_fetches=MAX_FETCHES_PER_RUN):
+    """Refreshes the cache for rows that are new, stale or changed. Returns the cache."""
+    cache = load_cache(cache_path)
+    now = time.time()
+    # Forget products that are no longer listed once their entry has expired
+    listed = {str(r.get("Part Number") or "").strip() for r in rows}
+    for part_num in [k for k, e in cache.items() if k not in listed and now - e.get("fetched", 0) > CACHE_TTL_HOURS * 3600]:
+        del cache[part_num]
+    todo = [r for r in rows
+            if r.get("Part Number") and r.get("Link")
+            and needs_fetch(r, cache.get(str(r["Part Number"]).strip()), now)]
+    print(f"[enrich] {len(todo)} of {len(rows)} products need fetching (max {max_fetches} this run).", flush=True)
+    todo = todo[:max_fetches]
+    if not todo:
+        save_cache(cache, cache_path)
+        return cache
+
+    import asyncio
+    fetched = asyncio.run(fetch_details(todo))
+    for row in todo:
+        part_num = str(row["Part Number"]).strip()
+        if part_num not in fetched: continue
+        cache[part_num] = {
+            "fetched": int(now),
+            "price": row.get("Discount Price"),
+            "promo": row.get("PromoCode"),
+            "fields": fetched[part_num],
+        }
+    save_cache(cache, cache_path)
+    print(f"[enrich] Cached details for {len(fetched)} products.", flush=True)
+    return cache